@@ -1,25 +1,62 @@
 #!/usr/bin/env python3
 """
 Find GOLD contracts in Upstox MCX instruments
+(streams the gzipped bundle with ijson so the full file is never held in memory)
+
+The bundle is cached at MCX_CACHE_PATH and revalidated with ETag /
+Last-Modified, so repeat runs on the same day skip the download.
 """
-import requests, gzip, io, json
+import os, requests, gzip, ijson
 
 MCX_URL = "https://assets.upstox.com/market-quote/instruments/exchange/MCX.json.gz"
+MCX_CACHE_PATH = os.getenv("MCX_CACHE_PATH") or "/tmp/MCX.json.gz"
+ETAG_PATH = MCX_CACHE_PATH + ".etag"
+LAST_MODIFIED_PATH = MCX_CACHE_PATH + ".last-modified"
 
-def main():
-    print("Downloading MCX instruments...")
-    r = requests.get(MCX_URL, timeout=60)
-    r.raise_for_status()
-    gz = gzip.GzipFile(fileobj=io.BytesIO(r.content))
-    txt = gz.read().decode("utf-8", errors="ignore")
+def _read(path):
     try:
-        items = json.loads(txt)
-    except Exception:
-        items = [json.loads(line) for line in txt.splitlines() if line.strip()]
+        with open(path) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def _write(path, value):
+    if value:
+        with open(path, "w") as f:
+            f.write(value)
+    elif os.path.exists(path):
+        os.remove(path)
 
-    for it in items:
-        if "GOLD" in str(it).upper():
-            print(it.get("instrument_key"), it.get("trading_symbol"), it.get("expiry"))
+def fetch_bundle():
+    """Make sure MCX_CACHE_PATH holds the current bundle; returns its path."""
+    headers = {}
+    if os.path.exists(MCX_CACHE_PATH):
+        etag, last_modified = _read(ETAG_PATH), _read(LAST_MODIFIED_PATH)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    with requests.get(MCX_URL, headers=headers, stream=True, timeout=60) as r:
+        if r.status_code == 304:
+            print("MCX instruments unchanged; using cached", MCX_CACHE_PATH)
+            return MCX_CACHE_PATH
+        r.raise_for_status()
+        print("Downloading MCX instruments...")
+        tmp = MCX_CACHE_PATH + ".part"
+        with open(tmp, "wb") as f:
+            for block in r.iter_content(chunk_size=1 << 16):
+                f.write(block)
+        os.replace(tmp, MCX_CACHE_PATH)
+        _write(ETAG_PATH, r.headers.get("ETag"))
+        _write(LAST_MODIFIED_PATH, r.headers.get("Last-Modified"))
+    return MCX_CACHE_PATH
+
+def main():
+    with gzip.open(fetch_bundle(), "rb") as gz:
+        for it in ijson.items(gz, "item"):
+            ts = it.get("trading_symbol") or ""
+            if "GOLD" in ts.upper():
+                print(it.get("instrument_key"), ts, it.get("expiry"))
 
 if __name__ == "__main__":
     main()
@@ -1,2 +1,2 @@
 #!/usr/bin/env bash
-python commodity_poller.py
+python -m upstox_poller --profile gold
@@ -0,0 +1,10 @@
+"""
+Upstox -> Telegram pollers in one package.
+
+One process can run any mix of profiles (see config.PROFILES):
+    python -m upstox_poller --profile gold --profile chain
+"""
+from .config import PollerConfig, PROFILES, load_config
+from .poller import Poller
+
+__all__ = ["Poller", "PollerConfig", "PROFILES", "load_config"]
@@ -0,0 +1,40 @@
+"""
+Entrypoint: python -m upstox_poller --profile gold [--profile chain ...]
+All selected profiles run in this one process and share one HTTP connection pool.
+"""
+import argparse, asyncio, logging, os
+
+from . import config
+from .config import PROFILES, load_config
+from .helpers import make_session, setup_logging
+from .poller import Poller
+
+try:
+    # faster drop-in event loop on Linux/macOS; stdlib asyncio loop otherwise
+    import uvloop
+except ImportError:
+    uvloop = None
+
+async def run_profiles(cfgs):
+    async with make_session() as session:
+        await asyncio.gather(*(Poller(cfg, session=session).run() for cfg in cfgs))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="upstox_poller", description="Upstox -> Telegram poller")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                        help="poll profile to run (repeatable; default: gold)")
+    args = parser.parse_args(argv)
+    setup_logging(getattr(logging, (os.getenv("LOG_LEVEL") or "INFO").upper(), logging.INFO))
+
+    if not config.UPSTOX_ACCESS_TOKEN or not config.TELEGRAM_BOT_TOKEN or not config.TELEGRAM_CHAT_ID:
+        logging.error("Missing env vars (UPSTOX_ACCESS_TOKEN, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)")
+        raise SystemExit(1)
+
+    profiles = dict.fromkeys(args.profile or ["gold"])
+    cfgs = [load_config(p) for p in profiles]
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(run_profiles(cfgs))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Env-driven configuration for the pollers.
+"""
+import os
+from dataclasses import dataclass, field
+
+# ---------- Credentials (env) ----------
+UPSTOX_ACCESS_TOKEN = os.getenv("UPSTOX_ACCESS_TOKEN")
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+
+TELEGRAM_RATE = int(os.getenv("TELEGRAM_RATE") or 25)  # Telegram caps bots at ~30 msgs/sec
+
+# Default keys you found earlier (override by EXPLICIT_INSTRUMENT_KEYS env if needed)
+DEFAULT_EXPLICIT_KEYS = os.getenv("DEFAULT_EXPLICIT_KEYS") or ",".join([
+    "MCX_FO|463267","MCX_FO|458302","MCX_FO|458303",
+    "MCX_FO|440939","MCX_FO|463393","MCX_FO|463265","MCX_FO|463266","MCX_FO|466028",
+])
+
+def _env_flag(name, default="false"):
+    return os.getenv(name, default).lower() in ("1","true","yes")
+
+@dataclass
+class PollerConfig:
+    """
+    One poll profile.
+    kind="ltp" polls `keys` via the LTP endpoint; kind="chain" polls `chains`
+    (list of (name, symbol, expiry)) via the option-chain endpoint.
+    """
+    name: str
+    kind: str = "ltp"                    # "ltp" | "chain"
+    keys: list = field(default_factory=list)
+    chains: list = field(default_factory=list)
+    poll_interval: int = 60
+    chunk_size: int = 4                  # number of keys per LTP request
+    retry_attempts: int = 2              # combined re-requests for missing keys, per cycle
+    retry_delay: float = 1.0             # seconds between retries
+    send_all: bool = False               # send every poll, not only on change
+    change_threshold_pct: float = 0.0
+    cache_ttl: int = 10                  # seconds a chunk response is reused
+    off_hours_poll_interval: int = 0     # >0: poll this rarely while MCX is closed
+
+    def __post_init__(self):
+        if self.kind not in ("ltp", "chain"):
+            raise ValueError(f"Unknown poller kind: {self.kind!r}")
+
+def _gold_profile():
+    keys_env = os.getenv("EXPLICIT_INSTRUMENT_KEYS", DEFAULT_EXPLICIT_KEYS)
+    return PollerConfig(
+        name="gold",
+        kind="ltp",
+        keys=[k.strip() for k in keys_env.split(",") if k.strip()],
+        poll_interval=int(os.getenv("POLL_INTERVAL") or 60),
+        chunk_size=int(os.getenv("CHUNK_SIZE") or 4),
+        retry_attempts=int(os.getenv("RETRY_ATTEMPTS") or 2),
+        retry_delay=float(os.getenv("RETRY_DELAY") or 1.0),
+        send_all=_env_flag("SEND_ALL_EVERY_POLL"),
+        change_threshold_pct=float(os.getenv("CHANGE_THRESHOLD_PCT") or 0.0),
+        cache_ttl=int(os.getenv("CACHE_TTL") or 10),
+        off_hours_poll_interval=int(os.getenv("OFF_HOURS_POLL_INTERVAL") or 900),
+    )
+
+_DEFAULT_CHAIN_SYMBOLS = {"NIFTY": "NSE_INDEX|Nifty 50", "TCS": "NSE_EQ|INE467B01029"}
+
+def _chain_profile():
+    chains = []
+    for name in ("NIFTY", "TCS"):
+        expiry = os.getenv(f"OPTION_EXPIRY_{name}") or ""
+        if expiry:
+            symbol = os.getenv(f"OPTION_SYMBOL_{name}") or _DEFAULT_CHAIN_SYMBOLS[name]
+            chains.append((name, symbol, expiry))
+    return PollerConfig(
+        name="chain",
+        kind="chain",
+        chains=chains,
+        poll_interval=int(os.getenv("POLL_INTERVAL") or 60),
+    )
+
+PROFILES = {"gold": _gold_profile, "chain": _chain_profile}
+
+def load_config(profile):
+    """Build the PollerConfig for `profile` from the current environment."""
+    try:
+        return PROFILES[profile]()
+    except KeyError:
+        raise ValueError(f"Unknown profile {profile!r} (choose from {', '.join(PROFILES)})") from None
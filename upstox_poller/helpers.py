@@ -0,0 +1,348 @@
+"""
+Shared helpers: HTTP session, Telegram sender, Upstox response parsing.
+"""
+import time, math, html, logging, logging.handlers, asyncio, aiohttp, orjson
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+import numpy as np
+
+from .config import UPSTOX_ACCESS_TOKEN, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_RATE
+
+# aiohttp can only decode "br" when a brotli binding is importable; never advertise it otherwise
+try:
+    import brotli  # noqa: F401
+    _HAVE_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _HAVE_BROTLI = True
+    except ImportError:
+        _HAVE_BROTLI = False
+
+# Ask for compressed bodies explicitly; option-chain payloads shrink several-fold.
+HEADERS = {"Accept":"application/json",
+           "Accept-Encoding":"gzip, br" if _HAVE_BROTLI else "gzip, deflate",
+           "Authorization":f"Bearer {UPSTOX_ACCESS_TOKEN}","User-Agent":"upstox-poller/1.0"}
+LTP_URL = "https://api.upstox.com/v3/market-quote/ltp"
+CHAIN_URL = "https://api.upstox.com/v3/option/chain"
+TELEGRAM_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+TELEGRAM_MAX_CHARS = 4000  # sendMessage hard limit is 4096
+# Upstox GETs: statuses worth retrying, attempts after the first, base backoff (0.5s, 1s, 2s)
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+HTTP_RETRIES = 3
+HTTP_BACKOFF = 0.5
+HTTP_MAX_RETRY_AFTER = 60  # a longer server-requested wait gives up instead of stalling the cycle
+
+# MCX trading session (IST, Mon-Fri)
+IST = timezone(timedelta(hours=5, minutes=30))
+MCX_OPEN = (9, 0)
+MCX_CLOSE = (23, 30)
+
+# One row per strike; columns are contiguous so per-strike analytics vectorize
+CHAIN_DTYPE = np.dtype([('strike','f8'),('ce_oi','i8'),('pe_oi','i8'),('ce_ltp','f4'),('pe_ltp','f4')])
+
+# Field names Upstox (and older payload shapes) use for the last traded price
+_LTP_KEYS = ('ltp','last_traded_price','lastPrice','lastTradedPrice','last','last_price','lt')
+# Shapes already reported as unknown (frozenset of dict keys, or type name); capped
+_LOGGED_SHAPES = set()
+_MAX_LOGGED_SHAPES = 64
+# Fields that carry the instrument key in list-shaped responses, in priority order
+_IK_FIELDS = ('instrument_key','instrumentKey','symbol')
+# Prefixes of Upstox instrument keys (segment names), for bare top-level mappings
+_IK_PREFIXES = ("MCX_","NSE_","BSE_")
+
+# ---------- Logging ----------
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg (+ exc)."""
+    def format(self, record):
+        out = {"ts": self.formatTime(record, "%Y-%m-%d %H:%M:%S"), "level": record.levelname,
+               "logger": record.name, "msg": record.getMessage()}
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(out).decode()
+
+_LOG_BUFFER = None
+
+def setup_logging(level=logging.INFO):
+    """
+    JSON-lines logging to stderr through a MemoryHandler: INFO lines are batched
+    (written on flush_logs() or when 64 pile up), WARNING+ goes out immediately.
+    """
+    global _LOG_BUFFER
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter())
+    _LOG_BUFFER = logging.handlers.MemoryHandler(capacity=64, flushLevel=logging.WARNING, target=stream)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_LOG_BUFFER)
+
+def flush_logs():
+    """Write out buffered log lines (called once per poll cycle)."""
+    if _LOG_BUFFER is not None:
+        _LOG_BUFFER.flush()
+
+# ---------- HTTP ----------
+def make_session():
+    """
+    Shared keep-alive aiohttp session for Upstox + Telegram (lives for the whole daemon).
+    HEADERS stay per-request so the Upstox bearer token never goes to Telegram.
+    """
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=60),
+        timeout=aiohttp.ClientTimeout(total=20),
+        auto_decompress=True)
+
+def _retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+async def upstox_get(session, url):
+    """
+    GET `url` with HEADERS; returns (status, body_bytes).
+    429/5xx responses and connection errors/timeouts are retried HTTP_RETRIES times
+    with exponential backoff, waiting at least as long as the server's Retry-After;
+    the last response (or error) is returned (or raised). A Retry-After beyond
+    HTTP_MAX_RETRY_AFTER returns the response instead of retrying early.
+    """
+    for attempt in range(HTTP_RETRIES + 1):
+        delay = HTTP_BACKOFF * 2 ** attempt
+        try:
+            async with session.get(url, headers=HEADERS) as r:
+                status, data = r.status, await r.read()
+                retry_after = _retry_after(r.headers.get("Retry-After"))
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == HTTP_RETRIES:
+                raise
+        else:
+            if status not in RETRY_STATUSES or attempt == HTTP_RETRIES:
+                return status, data
+            if retry_after is not None:
+                if retry_after > HTTP_MAX_RETRY_AFTER:
+                    logging.warning("Upstox asked to retry after %.0fs; giving up this request", retry_after)
+                    return status, data
+                delay = max(delay, retry_after)
+        await asyncio.sleep(delay)
+
+# ---------- Telegram ----------
+class TokenBucket:
+    """Token bucket allowing `rate` acquisitions per `per` seconds; consume() waits when empty."""
+    def __init__(self, rate=25, per=1.0):
+        self.tokens = rate
+        self.rate = rate
+        self.per = per
+        self.last = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate / self.per)
+        self.last = now
+
+    async def consume(self):
+        self._refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) * self.per / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+# one bucket for every poller in the process
+TELEGRAM_BUCKET = TokenBucket(rate=TELEGRAM_RATE)
+
+def _cut_point(text, limit):
+    """Largest cut <= limit that doesn't land inside an HTML entity like &amp;."""
+    amp = text.rfind("&", 0, limit)
+    if amp > 0 and text.find(";", amp, limit) == -1:
+        return amp
+    return limit
+
+def split_message(text, limit=TELEGRAM_MAX_CHARS):
+    """
+    Split text on line boundaries into pieces of at most `limit` chars.
+    A single over-long line is hard-split (never inside an entity), so lines that
+    carry HTML tags must fit in `limit` on their own -- see pre_block().
+    """
+    parts, cur = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if cur:
+                parts.append(cur)
+                cur = ""
+            cut = _cut_point(line, limit)
+            parts.append(line[:cut])
+            line = line[cut:]
+        if cur and len(cur) + 1 + len(line) > limit:
+            parts.append(cur)
+            cur = line
+        else:
+            cur = cur + "\n" + line if cur else line
+    if cur:
+        parts.append(cur)
+    return parts
+
+def pre_block(data, max_bytes=1500, limit=TELEGRAM_MAX_CHARS):
+    """
+    Escaped <pre>...</pre> snippet of raw bytes for a Telegram HTML message.
+    Kept on one line and truncated so the whole block fits in `limit` chars,
+    which means split_message() never separates the tags or cuts an entity.
+    """
+    snippet = " ".join(data[:max_bytes].decode("utf-8", "replace").splitlines())
+    escaped = html.escape(snippet, quote=False)  # quotes need no escaping inside <pre>
+    budget = limit - len("<pre></pre>")
+    if len(escaped) > budget:
+        escaped = escaped[:_cut_point(escaped, budget)]
+    return "<pre>" + escaped + "</pre>"
+
+async def _send_one(session, text):
+    payload = {"chat_id":TELEGRAM_CHAT_ID,"text":text,"parse_mode":"HTML","disable_web_page_preview":True}
+    await TELEGRAM_BUCKET.consume()
+    async with session.post(TELEGRAM_URL, json=payload, timeout=aiohttp.ClientTimeout(total=12)) as r:
+        if r.status == 429:
+            try:
+                body = orjson.loads(await r.read())
+                retry_after = float((body.get("parameters") or {}).get("retry_after") or 1)
+            except Exception:
+                retry_after = 1.0
+            logging.warning("Telegram rate limited; backing off %.1fs", retry_after)
+            await asyncio.sleep(retry_after)
+            return False
+        r.raise_for_status()
+    return True
+
+async def send_telegram(session, text):
+    """Send text as one message, or as spaced-out pieces if it exceeds TELEGRAM_MAX_CHARS."""
+    try:
+        parts = split_message(text)
+        for i, part in enumerate(parts):
+            if i:
+                await asyncio.sleep(1.0 / TELEGRAM_BUCKET.rate)
+            if not await _send_one(session, part):
+                return False
+        return True
+    except Exception as e:
+        logging.warning("Telegram send failed: %s", e)
+        return False
+
+# ---------- Upstox parsing ----------
+def _to_price(v):
+    """float(v) if v is a finite number or numeric string, else None."""
+    if v is None or v == "" or isinstance(v, bool):
+        return None
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+def _ltp_from_dict(d):
+    for k in _LTP_KEYS:
+        ltp = _to_price(d.get(k))
+        if ltp is not None:
+            return ltp
+    return None
+
+def _has_ltp_field(d):
+    """True if d (or a dict directly below it) carries any _LTP_KEYS field, even a null one."""
+    if any(k in d for k in _LTP_KEYS):
+        return True
+    return any(isinstance(v, dict) and any(k in v for k in _LTP_KEYS) for v in d.values())
+
+def _log_unknown_shape(payload):
+    shape = frozenset(payload) if isinstance(payload, dict) else type(payload).__name__
+    if shape in _LOGGED_SHAPES or len(_LOGGED_SHAPES) >= _MAX_LOGGED_SHAPES:
+        return
+    _LOGGED_SHAPES.add(shape)
+    logging.warning("No LTP field at depth <= 2; unexpected payload shape: %.300s", payload)
+
+def find_ltp(payload):
+    """
+    LTP lookup for the known payload shape: an LTP field at the top level or one
+    dict below it (or a bare numeric payload).
+    There is deliberately no recursive fallback: an unknown shape yields None
+    (shown as NA) and each distinct shape is logged once, so it can be added here
+    instead of paying for a full tree walk on every tick. A known field that is
+    null/empty (no trades yet) is just NA, not an unknown shape.
+    """
+    if not isinstance(payload, dict):
+        ltp = _to_price(payload) if not isinstance(payload, (list, tuple)) else None
+    else:
+        ltp = _ltp_from_dict(payload)
+        if ltp is None:
+            for v in payload.values():
+                if isinstance(v, dict):
+                    ltp = _ltp_from_dict(v)
+                    if ltp is not None:
+                        break
+    if ltp is None and payload is not None:
+        if not (isinstance(payload, dict) and _has_ltp_field(payload)):
+            _log_unknown_shape(payload)
+    return ltp
+
+def _pick(d, fields):
+    """First truthy d[f] for f in fields, else None."""
+    for f in fields:
+        v = d.get(f)
+        if v:
+            return v
+    return None
+
+def parse_response_into_map(raw):
+    """
+    Convert Upstox response into mapping: instrument_key -> payload (dict or value)
+    Accepts shapes like {'data':{ik:payload}} or list-of-items or mapping.
+    """
+    out = {}
+    if not raw:
+        return out
+    data = raw.get('data') if isinstance(raw, dict) and 'data' in raw else raw
+    if isinstance(data, dict):
+        # direct mapping: key -> payload
+        for ik, payload in data.items():
+            out[str(ik)] = payload
+        return out
+    if isinstance(data, list):
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            ik = _pick(item, _IK_FIELDS)
+            if ik:
+                out[str(ik)] = item
+        return out
+    # fallback: if top-level mapping
+    if isinstance(raw, dict):
+        for k, v in raw.items():
+            # if key looks like instrument_key (MCX_FO|..., NSE_EQ|...) assume mapping
+            if isinstance(k, str) and k.startswith(_IK_PREFIXES):
+                out[k] = v
+    return out
+
+def parse_chain(data):
+    """Option-chain response -> NumPy structured array of CHAIN_DTYPE (one row per strike)."""
+    rows = data.get("data") if isinstance(data, dict) else None
+    if not isinstance(rows, list):
+        return np.empty(0, dtype=CHAIN_DTYPE)
+    arr = np.empty(len(rows), dtype=CHAIN_DTYPE)
+    for i, row in enumerate(rows):
+        ce = row.get("ce") or {}
+        pe = row.get("pe") or {}
+        arr[i] = (row.get("strike_price") or 0, ce.get("oi") or 0, pe.get("oi") or 0,
+                  ce.get("ltp") or 0.0, pe.get("ltp") or 0.0)
+    return arr
+
+def mcx_is_open(now=None):
+    """True if `now` (default: current time) falls inside the MCX session in IST."""
+    now = now or datetime.now(IST)
+    if now.weekday() >= 5:
+        return False
+    return MCX_OPEN <= (now.hour, now.minute) <= MCX_CLOSE
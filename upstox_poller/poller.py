@@ -0,0 +1,271 @@
+"""
+Poller: runs one PollerConfig profile (LTP or option chain) until cancelled.
+"""
+import time, logging, asyncio
+from urllib.parse import quote_plus
+
+import orjson
+
+from .helpers import (LTP_URL, CHAIN_URL, make_session, send_telegram, upstox_get,
+                      find_ltp, parse_response_into_map, parse_chain,
+                      mcx_is_open, flush_logs, pre_block)
+
+class Poller:
+    """
+    Poller(cfg).run() polls Upstox every cfg.poll_interval seconds and pushes
+    updates to Telegram. Pass `session` to share one connection pool between pollers.
+    """
+    def __init__(self, cfg, session=None):
+        self.cfg = cfg
+        self.session = session
+        self.log = logging.getLogger(f"upstox_poller.{cfg.name}")
+        # Persist last known LTPs to only send diffs; kept in LRU order and bounded
+        # so rotating keys can't grow it without limit
+        self.last_ltps = {}
+        self.max_last_ltps = max(2 * len(cfg.keys), 16)
+        # tuple(sorted(keys_chunk)) -> (monotonic ts, json body); only successful bodies are kept
+        self.raw_cache = {}
+        # monotonic ts of the last cycle that returned at least one LTP
+        self.last_success_ts = 0.0
+        # bytes of the first non-empty Upstox body of the last cycle, error bodies included
+        # (for the NA diagnostic snippet)
+        self.last_raw = None
+        # keys are fixed for the poller's lifetime: split and URL-encode them once
+        size = cfg.chunk_size
+        self.chunks = [cfg.keys[i:i+size] for i in range(0, len(cfg.keys), size)]
+        self.chunk_urls = {tuple(c): self._ltp_url(c) for c in self.chunks}
+        self.chunk_urls.update({(ik,): self._ltp_url([ik]) for ik in cfg.keys})
+        self.keys_json = orjson.dumps(cfg.keys).decode()
+
+    @staticmethod
+    def _ltp_url(keys_chunk):
+        return LTP_URL + "?instrument_key=" + quote_plus(",".join(keys_chunk))
+
+    # ---------- LTP ----------
+    async def fetch_raw_for_chunk(self, keys_chunk, use_cache=True):
+        """
+        Fetch raw response for chunk of keys; returns (json, body_bytes).
+        On an HTTP error it logs the body and returns (None, body_bytes) so the NA
+        diagnostic can show it; on any other failure (None, None).
+        A successful body is reused for cfg.cache_ttl seconds unless use_cache=False.
+        """
+        if not keys_chunk:
+            return None, None
+        cache_key = tuple(sorted(keys_chunk))
+        if use_cache:
+            hit = self.raw_cache.get(cache_key)
+            if hit and time.monotonic() - hit[0] < self.cfg.cache_ttl:
+                return hit[1], hit[2]
+        url = self.chunk_urls.get(tuple(keys_chunk)) or self._ltp_url(keys_chunk)
+        try:
+            status, data = await upstox_get(self.session, url)
+            if status >= 400:
+                self.log.error("Upstox LTP HTTPError %s: %s", status, data[:800].decode("utf-8", "replace"))
+                return None, data
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug("Upstox LTP raw response: %s", data[:800].decode("utf-8", "replace"))
+            body = orjson.loads(data)
+            if use_cache:
+                self.raw_cache[cache_key] = (time.monotonic(), body, data)
+            return body, data
+        except Exception as e:
+            self.log.exception("Upstox LTP fetch failed: %s", e)
+            return None, None
+
+    @staticmethod
+    def extract_entry(ik, payload):
+        """Return (display_name, ltp_or_none) for one instrument payload."""
+        ltp = find_ltp(payload) if payload is not None else None
+        if isinstance(payload, dict):
+            display = payload.get('trading_symbol') or payload.get('symbol') or ik
+        else:
+            display = ik
+        return display, ltp
+
+    async def poll_once(self, keys_list):
+        """
+        Poll keys_list (list of instrument_key strings) in chunked fashion.
+        All chunks are fetched concurrently; keys still missing are then re-requested
+        together in one combined call per retry attempt.
+        Returns list of tuples (instrument_key, display_name, ltp_or_none)
+        """
+        # process in chunks to avoid huge request or partial API behavior
+        if keys_list == self.cfg.keys:
+            chunks = self.chunks
+        else:
+            size = self.cfg.chunk_size
+            chunks = [keys_list[i:i+size] for i in range(0, len(keys_list), size)]
+        raws = await asyncio.gather(*(self.fetch_raw_for_chunk(c) for c in chunks),
+                                    return_exceptions=True)
+        results = []
+        self.last_raw = None
+        for chunk, res in zip(chunks, raws):
+            if isinstance(res, BaseException):
+                self.log.warning("Upstox LTP chunk failed: %s", res)
+                res = (None, None)
+            raw, data = res
+            if self.last_raw is None and data:
+                self.last_raw = data
+            mapping = parse_response_into_map(raw)
+            for ik in chunk:
+                display, ltp = self.extract_entry(ik, mapping.get(ik))
+                results.append((ik, display, ltp))
+        # Retry missing keys (sometimes chunk request omits some) with one combined request
+        missing = [idx for idx, (_, _, ltp) in enumerate(results) if ltp is None]
+        for attempt in range(self.cfg.retry_attempts):
+            if not missing:
+                break
+            await asyncio.sleep(self.cfg.retry_delay)
+            raw, _ = await self.fetch_raw_for_chunk([results[idx][0] for idx in missing], use_cache=False)
+            mapping = parse_response_into_map(raw)
+            still_missing = []
+            for idx in missing:
+                ik = results[idx][0]
+                display, ltp = self.extract_entry(ik, mapping.get(ik))
+                if ltp is None:
+                    still_missing.append(idx)
+                else:
+                    results[idx] = (ik, display, ltp)
+            missing = still_missing
+        if any(ltp is not None for (_, _, ltp) in results):
+            self.last_success_ts = time.monotonic()
+        return results
+
+    def _remember_ltp(self, ik, ltp_f):
+        self.last_ltps.pop(ik, None)
+        self.last_ltps[ik] = ltp_f
+        if len(self.last_ltps) > self.max_last_ltps:
+            self.last_ltps.pop(next(iter(self.last_ltps)))
+
+    def _changed(self, prev, ltp_f):
+        if prev is None:
+            return True
+        threshold = self.cfg.change_threshold_pct
+        if threshold <= 0:
+            return ltp_f != prev
+        if prev == 0:
+            return ltp_f != 0
+        return abs((ltp_f - prev)/prev) * 100.0 >= threshold
+
+    async def decide_and_send(self, entries):
+        """
+        entries: list of (ik, display, ltp_or_none)
+        Sends Telegram only when relevant (change or cfg.send_all).
+        """
+        lines = [None] * len(entries)
+        send_any = False
+        none_count = 0
+        for idx, (ik, display, ltp) in enumerate(entries):
+            disp = display or ik or "UNKNOWN"
+            if ltp is None:
+                lines[idx] = f"{disp}: NA"
+                none_count += 1
+                continue
+            try:
+                ltp_f = float(ltp)
+            except Exception:
+                ltp_f = None
+            if ltp_f is not None:
+                # compare with last_ltps for change threshold
+                if self._changed(self.last_ltps.get(ik), ltp_f):
+                    send_any = True
+                self._remember_ltp(ik, ltp_f)
+            lines[idx] = f"{disp}: {ltp_f:,.2f}" if ltp_f is not None else f"{disp}: NA"
+        # Decide to send
+        if send_any or self.cfg.send_all:
+            ts = time.strftime("%Y-%m-%d %H:%M:%S")
+            # If most values are None, include small raw-diagnostic note in the same message
+            text = f"📈 Upstox LTP Update — {ts}\n" + "\n".join(lines)
+            if none_count >= max(3, len(entries)//2):
+                text += "\n\n<code>Note: many values are NA this cycle. Check instrument keys or API response.</code>"
+                if self.last_raw is not None:
+                    text += "\n" + pre_block(self.last_raw)
+            if await send_telegram(self.session, text):
+                self.log.info("Sent Telegram update (%d items, %d NA).", len(entries), none_count)
+            else:
+                self.log.warning("Telegram update failed (%d items, %d NA).", len(entries), none_count)
+        else:
+            self.log.info("No significant changes; skipped Telegram. %d NA.", none_count)
+
+    def _skip_off_hours(self):
+        """MCX closed and we already have fresh-enough values: don't hit Upstox at all."""
+        return (self.cfg.off_hours_poll_interval > 0 and not mcx_is_open()
+                and self.last_success_ts
+                and time.monotonic() - self.last_success_ts < self.cfg.off_hours_poll_interval)
+
+    async def ltp_cycle(self):
+        if self._skip_off_hours():
+            return
+        entries = await self.poll_once(self.cfg.keys)
+        if entries:
+            await self.decide_and_send(entries)
+        else:
+            self.log.warning("No entries parsed this cycle.")
+
+    # ---------- option chain ----------
+    async def fetch_chain(self, symbol, expiry):
+        url = CHAIN_URL + "?symbol=" + quote_plus(symbol) + "&expiry_date=" + quote_plus(expiry)
+        status, data = await upstox_get(self.session, url)
+        if status >= 400:
+            raise RuntimeError(f"Upstox chain HTTP {status}: {data[:300].decode('utf-8', 'replace')}")
+        return orjson.loads(data)
+
+    async def _chain_leg(self, name, symbol, expiry):
+        try:
+            data = await self.fetch_chain(symbol, expiry)
+            strikes = parse_chain(data)
+            await send_telegram(self.session, f"{name} Chain: {len(strikes)} strikes fetched")
+        except Exception as e:
+            self.log.warning("Error fetching %s chain: %s", name, e)
+
+    async def chain_cycle(self):
+        """Fetch every configured chain concurrently; each reports as soon as it lands."""
+        await asyncio.gather(*(self._chain_leg(*leg) for leg in self.cfg.chains))
+
+    # ---------- main loop ----------
+    def _log_start(self):
+        cfg = self.cfg
+        if cfg.kind == "ltp":
+            self.log.info("Starting poller for %d keys (chunk=%d, retry=%d).",
+                          len(cfg.keys), cfg.chunk_size, cfg.retry_attempts)
+            self.log.info("Instrument keys: %s", self.keys_json)
+        else:
+            self.log.info("Starting option chain poller for: %s",
+                          ", ".join(name for name, _, _ in cfg.chains))
+
+    async def run(self):
+        """Poll forever (until cancelled)."""
+        cfg = self.cfg
+        self._log_start()
+        if cfg.kind == "ltp" and not cfg.keys:
+            self.log.error("No instrument keys configured")
+            return
+        if cfg.kind == "chain" and not cfg.chains:
+            self.log.error("No option chains configured (set OPTION_EXPIRY_NIFTY / OPTION_EXPIRY_TCS)")
+            return
+        if self.session is None:
+            async with make_session() as self.session:
+                await self._loop()
+        else:
+            await self._loop()
+
+    async def _loop(self):
+        """
+        Run one cycle every cfg.poll_interval seconds against a monotonic deadline,
+        so slow cycles don't push every later poll back.
+        """
+        cycle = self.ltp_cycle if self.cfg.kind == "ltp" else self.chain_cycle
+        next_tick = time.monotonic()
+        while True:
+            try:
+                await cycle()
+            except Exception as e:
+                self.log.exception("Unhandled error in main loop: %s", e)
+            flush_logs()
+            next_tick += self.cfg.poll_interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.log.warning("cycle overran by %.2fs", -delay)
+                next_tick = time.monotonic()